@@ -7,6 +7,12 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import re
+from pandas.api.types import is_datetime64_any_dtype
+
+try:
+    import ahocorasick
+except ImportError:  # Optional: fall back to regex/substring matching
+    ahocorasick = None
 
 
 # Category mapping based on keywords
@@ -60,6 +66,90 @@ CATEGORY_KEYWORDS = {
     'Other': []  # Default category
 }
 
+# One precompiled alternation per category, used for vectorized matching
+CATEGORY_PATTERNS = {
+    category: re.compile('|'.join(map(re.escape, keywords)))
+    for category, keywords in CATEGORY_KEYWORDS.items()
+    if keywords
+}
+
+# Fixed levels so category/type columns group on small integer codes
+CAT_DTYPE = pd.CategoricalDtype(list(CATEGORY_KEYWORDS.keys()))
+TYPE_DTYPE = pd.CategoricalDtype(['Debit', 'Credit'])
+
+# Category priority follows CATEGORY_KEYWORDS order (Food is checked before Bills);
+# it doubles as the category's code in CAT_DTYPE
+CATEGORY_PRIORITY = {category: idx for idx, category in enumerate(CATEGORY_KEYWORDS)}
+OTHER_CODE = CATEGORY_PRIORITY['Other']
+
+
+def _build_keyword_automaton():
+    """
+    Build an Aho-Corasick automaton over all category keywords
+    
+    Returns:
+        ahocorasick.Automaton, or None if pyahocorasick is not installed
+    """
+    if ahocorasick is None:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            # Keywords shared by several categories belong to the first one
+            if keyword not in automaton:
+                automaton.add_word(keyword, CATEGORY_PRIORITY[category])
+    automaton.make_automaton()
+    return automaton
+
+
+KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _char_bit(ch):
+    """
+    Map a character to one bit of a 64-bit presence mask
+    """
+    return 1 << (ord(ch) & 63)
+
+
+def _build_keyword_scan():
+    """
+    Flatten CATEGORY_KEYWORDS for the plain substring scan
+    
+    Returns:
+        Tuple of (category, category_mask, ((keyword, first_char_bit), ...))
+        in priority order, where category_mask ORs the first-char bits of
+        all the category's keywords
+    """
+    scan = []
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if category == 'Other':
+            continue
+        entries = tuple((keyword.lower(), _char_bit(keyword[0])) for keyword in keywords)
+        category_mask = 0
+        for _, bit in entries:
+            category_mask |= bit
+        scan.append((category, category_mask, entries))
+    return tuple(scan)
+
+
+_KEYWORD_SCAN = _build_keyword_scan()
+
+
+def _match_code(desc_lower):
+    """
+    Return the code of the highest-priority category matched in a lowercased
+    description using a single pass of the keyword automaton
+    """
+    best = OTHER_CODE
+    for _, code in KEYWORD_AUTOMATON.iter(desc_lower):
+        if code < best:
+            best = code
+            if best == 0:
+                break
+    return best
+
 
 def categorize_transaction(description):
     """
@@ -76,17 +166,61 @@ def categorize_transaction(description):
     
     desc_lower = str(description).lower()
     
-    # Check each category
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        if category == 'Other':
+    if KEYWORD_AUTOMATON is not None:
+        return CAT_DTYPE.categories[_match_code(desc_lower)]
+    
+    # Bitmask of characters present; a keyword can only match if its
+    # first character is present, which rules out most `in` scans
+    present = 0
+    for ch in set(desc_lower):
+        present |= _char_bit(ch)
+    
+    # Check keywords in category priority order
+    for category, category_mask, entries in _KEYWORD_SCAN:
+        if not present & category_mask:
             continue
-        for keyword in keywords:
-            if keyword in desc_lower:
+        for keyword, bit in entries:
+            if present & bit and keyword in desc_lower:
                 return category
     
     return 'Other'
 
 
+def categorize_series(descriptions):
+    """
+    Categorize a whole column of transaction descriptions
+    
+    Args:
+        descriptions: Series of description strings
+        
+    Returns:
+        Categorical Series (CAT_DTYPE) aligned with the input index
+    """
+    # Statements repeat the same merchants, so classify each distinct description once
+    keys, uniques = pd.factorize(descriptions.fillna('').astype(str))
+    desc = pd.Series(uniques, dtype='object').str.lower()
+    
+    if KEYWORD_AUTOMATON is not None:
+        codes = np.fromiter((_match_code(d) for d in desc), dtype=np.int8, count=len(desc))
+    else:
+        codes = np.full(len(desc), OTHER_CODE, dtype=np.int8)
+        # Categories are checked in priority order; first match wins
+        for category, pattern in CATEGORY_PATTERNS.items():
+            mask = (codes == OTHER_CODE) & desc.str.contains(pattern, regex=True, na=False).to_numpy()
+            codes[mask] = CATEGORY_PRIORITY[category]
+    
+    return pd.Series(pd.Categorical.from_codes(codes[keys], dtype=CAT_DTYPE), index=descriptions.index)
+
+
+def _as_datetime(dates):
+    """
+    Parse a date column to datetime64, skipping columns that already are
+    """
+    if is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates, errors='coerce', cache=True, format='mixed')
+
+
 def analyze_spending(df):
     """
     Analyze spending data and generate insights
@@ -95,7 +229,9 @@ def analyze_spending(df):
         df: DataFrame with columns: date, description, amount, type
         
     Returns:
-        Dictionary with various metrics and insights
+        Dictionary with various metrics and insights. 'df' is the analyzed
+        DataFrame (with category and absolute '_amt' columns) and
+        'debit_mask'/'credit_mask' are boolean arrays selecting its rows
     """
     if df.empty:
         return {
@@ -108,90 +244,101 @@ def analyze_spending(df):
             'top_merchants': pd.DataFrame(),
             'average_transaction': 0,
             'largest_transaction': None,
-            'date_range': None
+            'date_range': None,
+            'category_levels': ('All',)
         }
     
-    # Make a copy to avoid modifying original
-    df = df.copy()
-    
-    # Add category column to main dataframe
-    if 'category' not in df.columns:
-        df['category'] = df['description'].apply(categorize_transaction)
+    # assign() leaves the caller's frame untouched without a full up-front copy.
+    # Dates are parsed once, descriptions categorized once, and absolute
+    # amounts computed once; debits/credits are then selected by mask
+    df = df.assign(
+        date=_as_datetime(df['date']),
+        category=categorize_series(df['description']),
+        _amt=df['amount'].abs()
+    )
     
     # Separate debits and credits
     # In GPay, debits are usually negative amounts or marked as 'Debit'
     if 'type' in df.columns:
-        debits = df[df['type'] == 'Debit'].copy()
-        credits = df[df['type'] == 'Credit'].copy()
+        debit_mask = (df['type'] == 'Debit').to_numpy()
+        credit_mask = (df['type'] == 'Credit').to_numpy()
     else:
         # If no type column, use amount sign to determine
-        debits = df[df['amount'] < 0].copy()
-        credits = df[df['amount'] > 0].copy()
-        debits['type'] = 'Debit'
-        credits['type'] = 'Credit'
-    
-    # Handle amount signs - make all amounts positive for analysis
-    if not debits.empty:
-        debits['amount'] = debits['amount'].abs()
-        if 'category' not in debits.columns:
-            debits['category'] = debits['description'].apply(categorize_transaction)
-    if not credits.empty:
-        credits['amount'] = credits['amount'].abs()
-        if 'category' not in credits.columns:
-            credits['category'] = credits['description'].apply(categorize_transaction)
+        debit_mask = (df['amount'] < 0).to_numpy()
+        credit_mask = (df['amount'] > 0).to_numpy()
+        df['type'] = np.where(debit_mask, 'Debit', 'Credit')
+    df['type'] = df['type'].astype(TYPE_DTYPE)
+    
+    debits = df.loc[debit_mask]
+    has_debits = bool(debit_mask.any())
     
     # Calculate totals
-    total_spending = debits['amount'].sum() if not debits.empty else 0
-    total_income = credits['amount'].sum() if not credits.empty else 0
+    total_spending = df.loc[debit_mask, '_amt'].sum() if has_debits else 0
+    total_income = df.loc[credit_mask, '_amt'].sum() if credit_mask.any() else 0
     net_balance = total_income - total_spending
     transaction_count = len(df)
     
-    # Spending by category
-    if not debits.empty:
-        spending_by_category = debits.groupby('category')['amount'].sum().sort_values(ascending=False)
-        spending_by_category = spending_by_category.reset_index()
-        spending_by_category.columns = ['category', 'amount']
+    # Spending by category and month, from one pass over the debit rows
+    if has_debits:
+        # Group on int64 month ordinals rather than hashing Period objects
+        month_codes = pd.PeriodIndex(debits['date'], freq='M').asi8
+        by_category_month = debits.groupby(
+            ['category', month_codes], sort=False, observed=True
+        )['_amt'].sum()
+        
+        category_totals = by_category_month.groupby(level=0, sort=False, observed=True).sum()
+        category_totals = category_totals.sort_values(ascending=False)
+        spending_by_category = pd.DataFrame({
+            'category': category_totals.index.to_numpy(),
+            'amount': category_totals.to_numpy()
+        })
+        
+        month_totals = by_category_month.groupby(level=1, sort=False).sum()
+        # Rows with unparseable dates (NaT ordinal) only count toward their category
+        month_totals = month_totals[month_totals.index != pd.NaT.value].sort_index()
+        monthly_spending = pd.DataFrame({
+            # pd.Period(ordinal=...) rather than PeriodIndex.from_ordinals, which needs pandas 2.2+
+            'month': [str(pd.Period(ordinal=ordinal, freq='M')) for ordinal in month_totals.index],
+            'amount': month_totals.to_numpy()
+        })
     else:
         spending_by_category = pd.DataFrame(columns=['category', 'amount'])
-    
-    # Monthly spending trends
-    if not debits.empty:
-        debits['month'] = pd.to_datetime(debits['date']).dt.to_period('M')
-        monthly_spending = debits.groupby('month')['amount'].sum().reset_index()
-        monthly_spending['month'] = monthly_spending['month'].astype(str)
-        monthly_spending.columns = ['month', 'amount']
-    else:
         monthly_spending = pd.DataFrame(columns=['month', 'amount'])
     
     # Top merchants (by frequency and amount)
-    if not debits.empty:
-        merchant_stats = debits.groupby('description').agg({
-            'amount': ['sum', 'count', 'mean']
-        }).reset_index()
-        merchant_stats.columns = ['merchant', 'total_amount', 'count', 'avg_amount']
-        merchant_stats = merchant_stats.sort_values('total_amount', ascending=False).head(10)
+    if has_debits:
+        merchant_agg = debits.groupby('description', sort=False, observed=True)['_amt'].agg(
+            ['sum', 'count', 'mean']
+        )
+        merchant_agg = merchant_agg.sort_values('sum', ascending=False).head(10)
+        merchant_stats = pd.DataFrame({
+            'merchant': merchant_agg.index.to_numpy(),
+            'total_amount': merchant_agg['sum'].to_numpy(),
+            'count': merchant_agg['count'].to_numpy(),
+            'avg_amount': merchant_agg['mean'].to_numpy()
+        })
     else:
         merchant_stats = pd.DataFrame(columns=['merchant', 'total_amount', 'count', 'avg_amount'])
     
     # Average transaction size
-    average_transaction = debits['amount'].mean() if not debits.empty else 0
+    average_transaction = debits['_amt'].mean() if has_debits else 0
     
     # Largest transaction
-    if not debits.empty:
-        largest_idx = debits['amount'].idxmax()
+    if has_debits:
+        largest_row = debits.iloc[np.nanargmax(debits['_amt'].to_numpy())]
         largest_transaction = {
-            'description': debits.loc[largest_idx, 'description'],
-            'amount': debits.loc[largest_idx, 'amount'],
-            'date': debits.loc[largest_idx, 'date'],
-            'category': debits.loc[largest_idx, 'category']
+            'description': largest_row['description'],
+            'amount': float(largest_row['_amt']),
+            'date': largest_row['date'],
+            'category': largest_row['category']
         }
     else:
         largest_transaction = None
     
     # Date range
-    if not df.empty:
-        min_date = pd.to_datetime(df['date']).min()
-        max_date = pd.to_datetime(df['date']).max()
+    if df['date'].notna().any():
+        min_date = df['date'].min()
+        max_date = df['date'].max()
         date_range = {
             'start': min_date.strftime('%Y-%m-%d'),
             'end': max_date.strftime('%Y-%m-%d'),
@@ -211,8 +358,10 @@ def analyze_spending(df):
         'average_transaction': round(average_transaction, 2),
         'largest_transaction': largest_transaction,
         'date_range': date_range,
-        'debits_df': debits,
-        'credits_df': credits
+        'category_levels': ('All',) + tuple(spending_by_category['category'].to_numpy().tolist()),
+        'df': df,
+        'debit_mask': debit_mask,
+        'credit_mask': credit_mask
     }
 
 
@@ -231,7 +380,7 @@ def get_spending_trends(df, period='monthly'):
         return pd.DataFrame()
     
     df = df.copy()
-    df['date'] = pd.to_datetime(df['date'])
+    df['date'] = _as_datetime(df['date'])
     
     # Filter debits only
     debits = df[df['type'] == 'Debit'].copy()
@@ -247,7 +396,7 @@ def get_spending_trends(df, period='monthly'):
     else:  # monthly
         debits['period'] = debits['date'].dt.to_period('M')
     
-    trends = debits.groupby('period')['amount'].sum().reset_index()
+    trends = debits.groupby('period', sort=False, observed=True)['amount'].sum().sort_index().reset_index()
     trends['period'] = trends['period'].astype(str)
     trends.columns = ['period', 'amount']
     
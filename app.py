@@ -3,12 +3,22 @@ GPay Spending Analyzer
 Streamlit web application for analyzing GPay transaction PDFs
 """
 
+import io
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 from pdf_parser import parse_gpay_pdf
 from analyzer import analyze_spending
 
+# Rows rendered in the transaction table; the CSV download always has every row
+MAX_DISPLAY_ROWS = 400
+
+# Parsed statements kept in server memory for widget reruns: only the most
+# recent few, and each for a limited time, so uploads don't accumulate
+CACHE_MAX_ENTRIES = 4
+CACHE_TTL_SECONDS = 600
+
 # Page configuration
 st.set_page_config(
     page_title="GPay Spending Analyzer",
@@ -42,6 +52,39 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+def _parse_and_analyze(file_bytes, debug):
+    """
+    Parse a GPay PDF and analyze it, cached on the file contents so widget
+    reruns reuse the result instead of re-parsing
+    """
+    df = parse_gpay_pdf(io.BytesIO(file_bytes), debug=debug)
+    insights = analyze_spending(df)
+    if not df.empty:
+        insights.update(_display_indexes(insights))
+    return df, insights
+
+
+def _display_indexes(insights):
+    """
+    Precompute row orderings and type masks for the transaction table so
+    filter/sort widget changes only index into cached arrays
+    """
+    analyzed_df = insights['df']
+    by_date = np.argsort(analyzed_df['date'].to_numpy(), kind='stable')[::-1]
+    by_amount = np.argsort(analyzed_df['_amt'].to_numpy(), kind='stable')[::-1]
+    by_description = np.argsort(analyzed_df['description'].astype(str).to_numpy(), kind='stable')
+    return {
+        'sort_indexes': {'Date': by_date, 'Amount': by_amount, 'Description': by_description},
+        'type_masks': {
+            'All': np.ones(len(analyzed_df), dtype=bool),
+            'Debit': insights['debit_mask'],
+            'Credit': insights['credit_mask']
+        }
+    }
+
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">💰 GPay Spending Analyzer</h1>', unsafe_allow_html=True)
@@ -83,10 +126,8 @@ def main():
         try:
             # Parse PDF
             with st.spinner("Parsing PDF and analyzing transactions..."):
-                # Reset file pointer
-                uploaded_file.seek(0)
                 debug_mode = st.session_state.get('debug_mode', False)
-                df = parse_gpay_pdf(uploaded_file, debug=debug_mode)
+                df, insights = _parse_and_analyze(uploaded_file.getvalue(), debug_mode)
             
             if df.empty:
                 st.error("⚠️ No transactions found in the PDF. Please check if the PDF format is correct.")
@@ -111,9 +152,6 @@ def main():
                 """)
                 return
             
-            # Analyze spending
-            insights = analyze_spending(df)
-            
             # Display success message
             st.success(f"✅ Successfully parsed {len(df)} transactions!")
             
@@ -280,29 +318,17 @@ def main():
             with col1:
                 show_type = st.selectbox("Filter by Type", ["All", "Debit", "Credit"])
             with col2:
-                categories = ['All'] + list(insights['spending_by_category']['category'].unique()) if not insights['spending_by_category'].empty else ['All']
-                show_category = st.selectbox("Filter by Category", categories)
+                show_category = st.selectbox("Filter by Category", insights['category_levels'])
             with col3:
                 sort_by = st.selectbox("Sort by", ["Date", "Amount", "Description"])
             
-            # Filter data
-            if show_type == "Debit":
-                display_df = insights.get('debits_df', df[df['type'] == 'Debit'].copy())
-            elif show_type == "Credit":
-                display_df = insights.get('credits_df', df[df['type'] == 'Credit'].copy())
-            else:  # All
-                display_df = df.copy()
-            
-            if show_category != "All" and 'category' in display_df.columns:
-                display_df = display_df[display_df['category'] == show_category]
-            
-            # Sort
-            if sort_by == "Date":
-                display_df = display_df.sort_values('date', ascending=False)
-            elif sort_by == "Amount":
-                display_df = display_df.sort_values('amount', ascending=False)
-            else:
-                display_df = display_df.sort_values('description')
+            # Filter and sort by indexing the cached orderings and masks
+            analyzed_df = insights['df']
+            idx = insights['sort_indexes'][sort_by]
+            idx = idx[insights['type_masks'][show_type][idx]]
+            if show_category != "All":
+                idx = idx[analyzed_df['category'].to_numpy()[idx] == show_category]
+            display_df = analyzed_df.take(idx)
             
             # Display table
             if not display_df.empty:
@@ -311,9 +337,11 @@ def main():
                 if 'category' in display_df.columns:
                     display_columns.append('category')
                 
-                display_df_display = display_df[display_columns].copy()
+                # Only the visible slice is formatted
+                display_df_display = display_df[display_columns].head(MAX_DISPLAY_ROWS).copy()
                 display_df_display['date'] = pd.to_datetime(display_df_display['date']).dt.strftime('%Y-%m-%d')
-                display_df_display['amount'] = display_df_display['amount'].abs().apply(lambda x: f"₹{x:,.2f}")
+                amounts = np.abs(display_df_display['amount'].to_numpy())
+                display_df_display['amount'] = [f"₹{x:,.2f}" for x in amounts]
                 
                 # Rename columns
                 column_mapping = {
@@ -325,9 +353,11 @@ def main():
                 display_df_display = display_df_display.rename(columns=column_mapping)
                 
                 st.dataframe(display_df_display, use_container_width=True, height=400)
+                if len(display_df) > MAX_DISPLAY_ROWS:
+                    st.caption(f"Showing the first {MAX_DISPLAY_ROWS} of {len(display_df)} transactions. Download the CSV for all of them.")
                 
                 # Download button
-                csv = display_df.to_csv(index=False)
+                csv = display_df.drop(columns='_amt').to_csv(index=False)
                 st.download_button(
                     label="📥 Download Transactions as CSV",
                     data=csv,
@@ -363,7 +393,8 @@ def main():
         3. Explore your spending insights!
         
         ### Privacy:
-        - Your PDF is processed in memory and not stored
+        - Your PDF is processed in memory and never written to disk
+        - Parsed results stay in a server memory cache (shared across sessions) for up to 10 minutes, at most 4 files
         - All processing happens locally in your browser session
         - No data is saved or transmitted to external servers
         """)
@@ -4,118 +4,206 @@ Extracts transaction data from GPay statement PDFs
 """
 
 import pdfplumber
+import numpy as np
 import pandas as pd
+from array import array
 from datetime import datetime
+import gc
+import io
+import multiprocessing
+import os
 import re
-import streamlit as st
+import threading
 
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # Optional: fall back to pdfplumber's text extraction
+    pdfium = None
 
-def parse_gpay_pdf(pdf_file, debug=False):
+
+# PDFium is not thread-safe, even across documents, and Streamlit runs each
+# session in its own thread; every PDFium call in this process holds this lock
+_PDFIUM_LOCK = threading.Lock()
+
+
+# Statements with at least this many pages are parsed across a process pool.
+# A text page takes ~65 ms; a pool adds ~0.1 s once the fork server is up,
+# and ~0.8 s more for the first pool of a server process
+_PARALLEL_MIN_PAGES = 16
+
+# Pages held open by pdfplumber at a time; its per-page object caches
+# otherwise grow with the document
+_PAGE_CHUNK = 32
+
+# Detect tables from ruling lines only, never from text alignment
+_TABLE_SETTINGS = {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
+
+# Patterns are compiled once at import instead of on every row/line
+
+# Table cell dates, in one alternation:
+# DD-MM-YYYY / DD/MM/YYYY, DD MMM YYYY / DD Month YYYY, YYYY-MM-DD
+_DATE_RE = re.compile(
+    r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\d{1,2}\s+\w+\s+\d{4}|\d{4}[-/]\d{1,2}[-/]\d{1,2})',
+    re.IGNORECASE
+)
+
+# A whole table cell holding an amount, once currency symbols and spaces are removed:
+# optional sign (+ for credits, - for debits) or parentheses, plain or Indian/Western
+# comma-grouped digits, optional decimals.
+# Used with fullmatch, and the pattern has no nested quantifiers, so it cannot backtrack badly
+_AMOUNT_RE = re.compile(r'\(?[-+]?(?:\d{1,3}(?:,\d{2,3})+|\d+)(?:\.\d{1,2})?\)?')
+_AMOUNT_STRIP_TBL = str.maketrans('', '', '₹$ \t')
+# Currency words (Rs, Rs., INR), and a trailing "/-" ("500/-") and/or Dr/Cr marker, in any case
+_AMOUNT_MARKER_RE = re.compile(r'rs\.?|inr|(?:/-)?\s*(?:(?:dr|cr)\.?)?\s*$', re.IGNORECASE)
+# Grouping commas, sign and parentheses, dropped from a matched amount before float()
+_AMOUNT_VALUE_TBL = str.maketrans('', '', ',()-')
+
+# Transaction type keywords in table cells; debit keywords take precedence
+_DEBIT_KEYWORDS = ('paid', 'sent', 'debit', 'withdrawal', 'deducted', 'spent')
+_CREDIT_KEYWORDS = ('received', 'credit', 'deposit', 'credited', 'added', 'refund')
+_DEBIT_KW_RE = re.compile('|'.join(_DEBIT_KEYWORDS))
+_CREDIT_KW_RE = re.compile('|'.join(_CREDIT_KEYWORDS))
+_TYPE_KW_RE = re.compile('|'.join(_DEBIT_KEYWORDS + _CREDIT_KEYWORDS))
+
+# Header words: in a table's first rows (_HEADER_RE), or in a single cell
+# that should not be taken as the description (_CELL_HEADER_RE)
+_HEADER_RE = re.compile(r'date|description|amount|transaction|debit|credit|balance')
+_CELL_HEADER_RE = re.compile(r'date|description|amount|transaction|balance|total')
+
+# Long digit runs in a table cell: reference, UPI and account numbers,
+# kept out of the description like time cells
+_REF_NUM_RE = re.compile(r'\d{6,}')
+
+# Header, summary and contact lines in statement text
+_SKIP_RE = re.compile(
+    r'date&time|transactiondetails|amount|transaction statement|statementperiod'
+    r'|sent received|contact|8081100105'
+)
+
+# GPay-specific date pattern: DD MMM, YYYY (e.g., "01Oct,2025")
+# This matches: 1-2 digits, 3 letters (month), comma, 4 digits (year)
+_GPAY_TEXT_DATE_RE = re.compile(r'(\d{1,2}[A-Za-z]{3},\d{4})', re.IGNORECASE)
+
+# Amount pattern: ₹ symbol followed by number with optional decimals and Indian comma notation
+# Matches: ₹85, ₹314.43, ₹1,64,148.10
+_GPAY_AMOUNT_RE = re.compile(r'₹\s*(\d{1,3}(?:[,]\d{2,3})*(?:[.]\d{1,2})?)')
+
+# Description noise: time (HH:MM AM/PM), UPI transaction ID, bank info.
+# Removed one after another: removing one can expose another (a time glued to
+# an account number, "Paidby" left next to a bank code), so they can't share a pass
+_TIME_RE = re.compile(r'\d{1,2}:\d{2}\s*(?:AM|PM)', re.IGNORECASE)
+_UPI_RE = re.compile(r'UPITransactionID:\s*\d+', re.IGNORECASE)
+_BANK_RE = re.compile(r'Paidby[A-Za-z]+\d+', re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+
+# GPay date format: "01Oct,2025" (day + month abbreviation + comma + year)
+_GPAY_DATE_RE = re.compile(r'(\d{1,2})([A-Za-z]{3}),(\d{4})', re.IGNORECASE)
+_DIGIT_RE = re.compile(r'\d')
+_NUM_RE = re.compile(r'\d+')
+
+# Fast paths for the common shapes, tried before the strptime waterfall:
+# DD-MM-YYYY / DD/MM/YY / DD.MM.YYYY (same separator twice), YYYY-MM-DD / YYYY/MM/DD,
+# and DD Mon YYYY / DD Mon, YYYY
+_DMY_RE = re.compile(r'^(\d{1,2})([-/.])(\d{1,2})\2(\d{4}|\d{2})$')
+_YMD_RE = re.compile(r'^(\d{4})([-/])(\d{1,2})\2(\d{1,2})$')
+_D_MON_Y_RE = re.compile(r'^(\d{1,2})\s+([A-Za-z]{3}),?\s+(\d{4})$')
+
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# Common formats (Indian formats first, including GPay format)
+_DATE_FORMATS = (
+    '%d %b, %Y',     # 01 Oct, 2025
+    '%d%b %Y',       # 01Oct 2025
+    '%d %b %Y',      # 01 Oct 2025
+    '%d-%m-%Y',      # 25-12-2024
+    '%d/%m/%Y',      # 25/12/2024
+    '%d.%m.%Y',      # 25.12.2024
+    '%d-%m-%y',      # 25-12-24
+    '%d/%m/%y',      # 25/12/24
+    '%d.%m.%y',      # 25.12.24
+    '%Y-%m-%d',      # 2024-12-25
+    '%Y/%m/%d',      # 2024/12/25
+    '%d %B %Y',      # 25 December 2024
+    '%d-%b-%Y',      # 25-Dec-2024
+    '%d-%B-%Y',      # 25-December-2024
+    '%b %d, %Y',     # Dec 25, 2024
+    '%B %d, %Y',     # December 25, 2024
+    '%m/%d/%Y',      # 12/25/2024 (US format)
+    '%m-%d-%Y',      # 12-25-2024 (US format)
+)
+
+
+def parse_gpay_pdf(pdf_file, debug=False, always_extract_text=False):
     """
     Parse GPay PDF and extract transaction data
     
     Args:
         pdf_file: File-like object or bytes from Streamlit file uploader
         debug: If True, show debug information
+        always_extract_text: If True, parse the full text of pages whose tables
+            already yielded transactions (by default only the text outside
+            those tables is parsed)
         
     Returns:
         pandas DataFrame with columns: date, description, amount, type
     """
-    transactions = []
+    # Parsed transactions, accumulated column-wise
+    dates, descriptions, amounts, types = [], [], array('d'), []
+    columns = (dates, descriptions, amounts, types)
+    seen = set()  # Dedup keys of transactions added so far
     debug_info = []
+    if debug:
+        # Only debug output needs Streamlit, so pool workers never import it
+        import streamlit as st
     
     try:
-        # Reset file pointer if it's a file-like object
-        if hasattr(pdf_file, 'seek'):
-            pdf_file.seek(0)
+        pdf_bytes = _read_pdf_bytes(pdf_file)
         
         # Open PDF with pdfplumber
-        with pdfplumber.open(pdf_file) as pdf:
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
             total_pages = len(pdf.pages)
-            if debug:
-                debug_info.append(f"Total pages: {total_pages}")
+        if debug:
+            debug_info.append(f"Total pages: {total_pages}")
+        
+        # Short statements, and hosts without a second CPU, are parsed in-process;
+        # pool start-up would dominate
+        workers = min(_available_cpus(), total_pages)
+        if total_pages < _PARALLEL_MIN_PAGES or workers < 2:
+            page_results = _parse_page_range(pdf_bytes, list(range(1, total_pages + 1)),
+                                             debug, always_extract_text)
+        else:
+            page_results = _parse_pages_parallel(pdf_bytes, total_pages, workers, debug, always_extract_text)
+        
+        # Merge page results in page order so deduplication matches a sequential pass
+        for table_transactions, text_transactions, page_debug in page_results:
+            debug_info.extend(page_debug)
             
-            # Iterate through all pages
-            for page_num, page in enumerate(pdf.pages, 1):
-                if debug:
-                    debug_info.append(f"\n--- Processing page {page_num} ---")
-                
-                # Try to extract tables first (most common format)
-                tables = page.extract_tables()
-                
-                if tables:
-                    if debug:
-                        debug_info.append(f"Found {len(tables)} table(s) on page {page_num}")
-                    
-                    for table_idx, table in enumerate(tables):
-                        if debug:
-                            debug_info.append(f"  Table {table_idx + 1} has {len(table)} rows")
-                            # Show first few rows for debugging
-                            if len(table) > 0:
-                                sample_rows = table[:3]
-                                for idx, sample_row in enumerate(sample_rows):
-                                    debug_info.append(f"    Row {idx}: {sample_row}")
-                        
-                        # Process table rows
-                        for row_idx, row in enumerate(table):
-                            if row and len(row) >= 2:
-                                # Clean row data
-                                row_data = [cell.strip() if cell else "" for cell in row]
-                                
-                                # Skip if all cells are empty or very short
-                                if not any(cell and len(cell) > 2 for cell in row_data):
-                                    continue
-                                
-                                # Skip header-like rows
-                                if any(header in ' '.join(row_data).lower() for header in 
-                                       ['date', 'description', 'amount', 'transaction', 'debit', 'credit', 'balance']):
-                                    if row_idx == 0 or row_idx < 3:  # Likely header row
-                                        continue
-                                
-                                transaction = _parse_table_row(row_data, debug)
-                                if transaction:
-                                    transactions.append(transaction)
-                                    if debug and len(transactions) <= 5:
-                                        debug_info.append(f"  ✓ Parsed transaction: {transaction}")
-                
-                # Always try text extraction as well (some PDFs have text but not tables)
-                text = page.extract_text()
-                if text:
-                    if debug:
-                        if not tables:
-                            debug_info.append(f"  No tables found, extracting text (length: {len(text)} chars)")
-                        # Show sample of extracted text (first 500 chars)
-                        sample_text = text[:500].replace('\n', ' ').strip()
-                        debug_info.append(f"  Sample text: {sample_text}...")
-                    
-                    # Try to parse text-based transactions
-                    text_transactions = _parse_text_transactions(text, debug)
-                    if text_transactions:
-                        if debug:
-                            debug_info.append(f"  Found {len(text_transactions)} text transactions")
-                        # Avoid duplicates
-                        for tx in text_transactions:
-                            # Simple duplicate check
-                            is_duplicate = any(
-                                tx.get('date') == existing.get('date') and
-                                abs(tx.get('amount', 0) - existing.get('amount', 0)) < 0.01 and
-                                tx.get('description', '')[:20] == existing.get('description', '')[:20]
-                                for existing in transactions
-                            )
-                            if not is_duplicate:
-                                transactions.append(tx)
-                                if debug and len(transactions) <= 5:
-                                    debug_info.append(f"  ✓ Parsed text transaction: {tx}")
-                    elif debug:
-                        debug_info.append(f"  No transactions found in text extraction")
+            for transaction in table_transactions:
+                if _add_transaction(transaction, columns, seen):
+                    if debug and len(dates) <= 5:
+                        debug_info.append(f"  ✓ Parsed transaction: {transaction}")
+            
+            # Avoid duplicates
+            for tx in text_transactions:
+                if _add_transaction(tx, columns, seen):
+                    if debug and len(dates) <= 5:
+                        debug_info.append(f"  ✓ Parsed text transaction: {tx}")
         
         # Show debug info if requested
         if debug and debug_info:
             st.info("Debug Info:\n" + "\n".join(debug_info))
         
         # Convert to DataFrame
-        if transactions:
-            df = pd.DataFrame(transactions)
+        if dates:
+            df = pd.DataFrame({
+                'date': pd.to_datetime(dates),
+                'description': descriptions,
+                'amount': np.asarray(amounts),
+                'type': pd.Categorical(types)
+            })
             # Clean and format data
             df = _clean_dataframe(df)
             if debug:
@@ -139,6 +227,269 @@ def parse_gpay_pdf(pdf_file, debug=False):
             raise Exception(f"Error parsing PDF: {str(e)}. Please check if the PDF format is correct.")
 
 
+def _read_pdf_bytes(pdf_file):
+    """
+    Read the whole PDF into memory so it can be reopened per page range
+    """
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if hasattr(pdf_file, 'read'):
+        # Reset file pointer if it's a file-like object
+        if hasattr(pdf_file, 'seek'):
+            pdf_file.seek(0)
+        return pdf_file.read()
+    with open(pdf_file, 'rb') as f:
+        return f.read()
+
+
+def _available_cpus():
+    """
+    Count the CPUs this process may run on, honouring CPU affinity (taskset,
+    container cpusets) where the platform reports it
+    """
+    if hasattr(os, 'process_cpu_count'):  # Python 3.13+
+        return os.process_cpu_count() or 1
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _parse_pages_parallel(pdf_bytes, total_pages, workers, debug=False, always_extract_text=False):
+    """
+    Parse pages across a process pool of up to `workers` processes,
+    one contiguous page range per worker
+    
+    Returns:
+        List of per-page results (see _parse_page), in page order
+    """
+    chunk_size = -(-total_pages // workers)  # Ceiling division
+    page_ranges = [list(range(start + 1, min(start + chunk_size, total_pages) + 1))
+                   for start in range(0, total_pages, chunk_size)]
+    
+    # Workers are never forked from the multi-threaded Streamlit server; the fork
+    # server imports this module once, so workers start without re-importing it
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(start_method)
+    if start_method == 'forkserver':
+        context.set_forkserver_preload([__name__])
+    with context.Pool(len(page_ranges)) as pool:
+        chunks = pool.starmap(_parse_page_range,
+                              [(pdf_bytes, page_numbers, debug, always_extract_text)
+                               for page_numbers in page_ranges])
+    return [result for chunk in chunks for result in chunk]
+
+
+def _parse_page_range(pdf_bytes, page_numbers, debug=False, always_extract_text=False):
+    """
+    Parse the given (1-based) page numbers, reopening the PDF for every
+    _PAGE_CHUNK pages so memory stays flat on long statements.
+    Once PDFium's text loses transactions on a page, the remaining pages are
+    read with pdfplumber only: the layout is the same throughout a statement
+    """
+    results = []
+    pdfium_doc = _open_pdfium(pdf_bytes)
+    try:
+        for start in range(0, len(page_numbers), _PAGE_CHUNK):
+            chunk = page_numbers[start:start + _PAGE_CHUNK]
+            with pdfplumber.open(io.BytesIO(pdf_bytes), pages=chunk) as pdf:
+                for page in pdf.pages:
+                    *result, pdfium_missed = _parse_page(page, page.page_number, debug,
+                                                         pdfium_doc, always_extract_text)
+                    results.append(tuple(result))
+                    if pdfium_missed:
+                        with _PDFIUM_LOCK:
+                            pdfium_doc.close()
+                        pdfium_doc = None
+            # Release the closed chunk's pdfminer object graph before the next one
+            gc.collect()
+        return results
+    finally:
+        if pdfium_doc is not None:
+            with _PDFIUM_LOCK:
+                pdfium_doc.close()
+
+
+def _open_pdfium(pdf_bytes):
+    """
+    Open a pypdfium2 handle for fast text extraction, or None if unavailable
+    """
+    if pdfium is None:
+        return None
+    with _PDFIUM_LOCK:
+        return pdfium.PdfDocument(pdf_bytes)
+
+
+def _extract_text(page, page_num, pdfium_doc=None):
+    """
+    Extract a page's plain text, via PDFium when available (much faster than
+    pdfminer) and pdfplumber otherwise
+    """
+    if pdfium_doc is None:
+        return page.extract_text()
+    
+    with _PDFIUM_LOCK:
+        pdfium_page = pdfium_doc[page_num - 1]
+        textpage = pdfium_page.get_textpage()
+        try:
+            text = textpage.get_text_range()
+        finally:
+            textpage.close()
+            pdfium_page.close()
+    return text.replace('\r\n', '\n')
+
+
+def _parse_page(page, page_num, debug=False, pdfium_doc=None, always_extract_text=False):
+    """
+    Extract table and text transactions from a single pdfplumber page;
+    text comes from pdfium_doc when given (falling back to pdfplumber when it
+    leaves dates without a transaction), tables always from pdfplumber.
+    Once the tables yielded transactions, only the text outside them is read
+    (with pdfplumber), unless always_extract_text is set
+    
+    Returns:
+        Tuple of (table_transactions, text_transactions, debug_lines,
+        pdfium_missed), where pdfium_missed is True if pdfplumber found
+        text transactions that PDFium's text lost; deduplication across pages
+        is left to the caller
+    """
+    table_transactions = []
+    text_transactions = []
+    debug_info = []
+    
+    if debug:
+        debug_info.append(f"\n--- Processing page {page_num} ---")
+    
+    # Try to extract tables first (most common format); cell text is only
+    # extracted for tables that detection actually found
+    found = page.find_tables(_TABLE_SETTINGS)
+    tables = [table.extract() for table in found] if found else []
+    
+    if tables:
+        if debug:
+            debug_info.append(f"Found {len(tables)} table(s) on page {page_num}")
+        
+        for table_idx, table in enumerate(tables):
+            if debug:
+                debug_info.append(f"  Table {table_idx + 1} has {len(table)} rows")
+                # Show first few rows for debugging
+                if len(table) > 0:
+                    sample_rows = table[:3]
+                    for idx, sample_row in enumerate(sample_rows):
+                        debug_info.append(f"    Row {idx}: {sample_row}")
+            
+            # Process table rows
+            for row_idx, row in enumerate(table):
+                if row and len(row) >= 2:
+                    # Clean row data
+                    row_data = [cell.strip() if cell else "" for cell in row]
+                    
+                    # Skip if all cells are empty or very short
+                    if not any(cell and len(cell) > 2 for cell in row_data):
+                        continue
+                    
+                    # Skip header-like rows; only the first rows are likely headers
+                    if row_idx < 3 and _HEADER_RE.search(' '.join(row_data).lower()):
+                        continue
+                    
+                    transaction = _parse_table_row(row_data, debug)
+                    if transaction:
+                        table_transactions.append(transaction)
+    
+    # Text outside the tables holds any free-text transactions (some PDFs have
+    # text but not tables, others mix both); once the tables yielded transactions,
+    # only that region is read so table rows aren't parsed a second time
+    if table_transactions and not always_extract_text:
+        if debug:
+            debug_info.append(f"  {len(table_transactions)} table transactions found, "
+                              f"extracting text outside the tables only")
+        text = _outside_tables(page, found).extract_text()
+        text_transactions, _ = _parse_page_text(text, tables, debug, debug_info)
+        return table_transactions, text_transactions, debug_info, False
+    
+    text = _extract_text(page, page_num, pdfium_doc)
+    text_transactions, unparsed = _parse_page_text(text, tables, debug, debug_info)
+    
+    # PDFium returns text in content-stream order, so layouts that stack fields
+    # (time under the date, UPI ID under the payee) or wrap a payee onto a second
+    # line lose the line grouping the text parser relies on; re-read pages where
+    # dates were left without a transaction with pdfplumber's layout-aware text
+    pdfium_missed = False
+    if unparsed and pdfium_doc is not None:
+        if debug:
+            debug_info.append(f"  Retrying page {page_num} text with pdfplumber")
+        text = page.extract_text()
+        plumber_transactions, _ = _parse_page_text(text, tables, debug, debug_info)
+        pdfium_missed = len(plumber_transactions) > len(text_transactions)
+        text_transactions = plumber_transactions
+    
+    return table_transactions, text_transactions, debug_info, pdfium_missed
+
+
+def _outside_tables(page, found):
+    """
+    Restrict a pdfplumber page to the area outside the given found tables
+    """
+    region = page
+    for table in found:
+        region = region.outside_bbox(table.bbox, strict=False)
+    return region
+
+
+def _parse_page_text(text, tables, debug, debug_info):
+    """
+    Parse text-based transactions from a page's extracted text,
+    appending debug lines to debug_info
+    
+    Returns:
+        Tuple of (transactions, unparsed), as from _parse_text_transactions
+    """
+    if not text:
+        return [], 0
+    
+    if debug:
+        if not tables:
+            debug_info.append(f"  No tables found, extracting text (length: {len(text)} chars)")
+        # Show sample of extracted text (first 500 chars)
+        sample_text = text[:500].replace('\n', ' ').strip()
+        debug_info.append(f"  Sample text: {sample_text}...")
+    
+    # Try to parse text-based transactions
+    text_transactions, unparsed = _parse_text_transactions(text, debug)
+    if debug:
+        if text_transactions:
+            debug_info.append(f"  Found {len(text_transactions)} text transactions")
+        else:
+            debug_info.append(f"  No transactions found in text extraction")
+        if unparsed:
+            debug_info.append(f"  {unparsed} date(s) in text without a transaction")
+    return text_transactions, unparsed
+
+
+def _add_transaction(transaction, columns, seen):
+    """
+    Append a transaction to the (dates, descriptions, amounts, types)
+    columns unless one with the same date, amount and description prefix
+    was already added
+    
+    Returns:
+        True if the transaction was appended
+    """
+    key = (
+        transaction.get('date'),
+        round(transaction.get('amount', 0.0), 2),
+        (transaction.get('description') or '')[:20]
+    )
+    if key in seen:
+        return False
+    seen.add(key)
+    dates, descriptions, amounts, types = columns
+    dates.append(transaction['date'])
+    descriptions.append(transaction['description'])
+    amounts.append(transaction['amount'])
+    types.append(transaction['type'])
+    return True
+
+
 def _parse_table_row(row_data, debug=False):
     """
     Parse a single table row into a transaction dictionary
@@ -147,117 +498,73 @@ def _parse_table_row(row_data, debug=False):
     if not row_data or len(row_data) < 2:
         return None
     
-    # Filter out empty cells
-    row_data = [cell for cell in row_data if cell and str(cell).strip()]
-    if len(row_data) < 2:
+    # Filter out empty cells, stripping each once up front
+    cells = [cell_str for cell_str in (str(cell).strip() for cell in row_data if cell) if cell_str]
+    if len(cells) < 2:
+        return None
+    
+    # A transaction needs a date and an amount, so rows without any digit
+    # (notes, footers) can be rejected before any per-cell work
+    if not _DIGIT_RE.search(''.join(cells)):
         return None
     
     transaction = {}
+    # Description is usually the longest non-empty cell that's not date/amount/type
+    descriptions = []
     
-    # More flexible date patterns
-    date_patterns = [
-        r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',  # DD-MM-YYYY, DD/MM/YYYY
-        r'(\d{1,2}\s+\w{3}\s+\d{4})',  # DD MMM YYYY
-        r'(\d{1,2}\s+\w+\s+\d{4})',  # DD Month YYYY
-        r'(\d{4}[-/]\d{1,2}[-/]\d{1,2})',  # YYYY-MM-DD
-    ]
-    
-    # More flexible amount patterns (order matters - try more specific first)
-    amount_patterns = [
-        r'[₹Rs$]?\s*-?\d{1,3}(?:[,]\d{2,3})*(?:[.]\d{1,2})?',  # With currency, commas, optional decimals
-        r'[₹Rs$]\s*\d{1,3}(?:[,]\d{2,3})*(?:[.]\d{1,2})?',  # Currency symbol with space
-        r'\(?\d{1,3}(?:[,]\d{2,3})*(?:[.]\d{1,2})?\)?',  # Amount in parentheses (negative)
-        r'-?\d{1,3}(?:[,]\d{2,3})*(?:[.]\d{1,2})?',  # Amount without currency symbol
-        r'[₹Rs$]?\s*-?\d+[.,]\d{2}',  # Standard amount with decimals
-        r'[₹Rs$]?\s*-?\d+',  # Amount without decimals (integers)
-    ]
-    
-    # Try to identify date and amount in each cell
-    for cell in row_data:
-        if not cell:
-            continue
+    # One pass: identify date, amount and type, and collect the cells that are none of them
+    for cell_str in cells:
+        cell_lower = cell_str.lower()
         
-        cell_str = str(cell).strip()
+        # Plain numbers (digits with up to two decimals) are classified without any
+        # pattern matching: always an amount, never a date
+        if _is_plain_amount(cell_str):
+            date_match = None
+            amount_str = cell_str
+            is_amount = True
+        else:
+            date_match = _DATE_RE.search(cell_str)
+            amount_str = _normalize_amount(cell_str)
+            is_amount = _AMOUNT_RE.fullmatch(amount_str) is not None
         
         # Check if it's a date
-        if 'date' not in transaction:
-            for pattern in date_patterns:
-                date_match = re.search(pattern, cell_str, re.IGNORECASE)
-                if date_match:
-                    try:
-                        date_str = date_match.group(1)
-                        parsed_date = _parse_date(date_str)
-                        # Validate date is reasonable (not too far in future/past)
-                        if parsed_date.year >= 2020 and parsed_date.year <= 2030:
-                            transaction['date'] = parsed_date
-                            break
-                    except:
-                        continue
+        if date_match and 'date' not in transaction:
+            try:
+                parsed_date = _parse_date(date_match.group(1))
+                # Validate date is reasonable (not too far in future/past)
+                if parsed_date.year >= 2020 and parsed_date.year <= 2030:
+                    transaction['date'] = parsed_date
+            except:
+                pass
         
-        # Check if it's an amount
-        if 'amount' not in transaction:
-            # Check for negative indicators first
-            is_negative = cell_str.strip().startswith('-') or cell_str.strip().startswith('(') or 'debit' in cell_str.lower()
-            
-            for pattern in amount_patterns:
-                # Try matching on cleaned string (without commas for pattern matching)
-                test_str = cell_str.replace(',', '')
-                amount_match = re.search(pattern, test_str)
-                if amount_match:
-                    try:
-                        amount_str = amount_match.group(0)
-                        # Remove currency symbols, spaces, commas, and parentheses
-                        amount_str = re.sub(r'[₹Rs$,\s()]', '', amount_str).strip()
-                        
-                        # Check if negative (could be in original string or amount_str)
-                        if amount_str.startswith('-') or cell_str.strip().startswith('('):
-                            is_negative = True
-                            amount_str = amount_str.replace('-', '')
-                        
-                        if amount_str:
-                            try:
-                                amount_value = float(amount_str)
-                                if is_negative:
-                                    amount_value = -amount_value
-                                # Only accept reasonable amounts (between 0.01 and 10 million)
-                                if 0.01 <= abs(amount_value) <= 10000000:
-                                    transaction['amount'] = amount_value
-                                    break
-                            except ValueError:
-                                continue
-                    except Exception as e:
-                        continue
+        # Check if it's an amount (the whole cell must be one)
+        if is_amount and 'amount' not in transaction:
+            # A leading minus or parentheses mark a negative amount
+            is_negative = amount_str.startswith('-') or '(' in amount_str
+            amount_value = float(amount_str.translate(_AMOUNT_VALUE_TBL))
+            if is_negative:
+                amount_value = -amount_value
+            # Only accept reasonable amounts (between 0.01 and 10 million)
+            if 0.01 <= abs(amount_value) <= 10000000:
+                transaction['amount'] = amount_value
         
         # Check for transaction type keywords
-        cell_lower = cell_str.lower()
-        type_keywords = {
-            'debit': ['paid', 'sent', 'debit', 'withdrawal', 'deducted', 'spent'],
-            'credit': ['received', 'credit', 'deposit', 'credited', 'added', 'refund']
-        }
         if 'type' not in transaction:
-            for tx_type, keywords in type_keywords.items():
-                if any(keyword in cell_lower for keyword in keywords):
-                    transaction['type'] = tx_type.capitalize()
-                    break
-    
-    # Description is usually the longest non-empty cell that's not date/amount/type
-    descriptions = []
-    for cell in row_data:
-        if not cell:
-            continue
-        cell_str = str(cell).strip()
-        
-        # Skip if it's a date
-        is_date = any(re.search(pattern, cell_str, re.IGNORECASE) for pattern in date_patterns)
-        # Skip if it's an amount
-        is_amount = any(re.search(pattern, cell_str.replace(',', '')) for pattern in amount_patterns)
-        # Skip if it's a type indicator
-        is_type = any(keyword in cell_str.lower() for keywords in type_keywords.values() for keyword in keywords)
-        # Skip very short cells or common headers
-        is_header = any(header in cell_str.lower() for header in 
-                       ['date', 'description', 'amount', 'transaction', 'balance', 'total'])
+            is_type = True
+            if _DEBIT_KW_RE.search(cell_lower):
+                transaction['type'] = 'Debit'
+            elif _CREDIT_KW_RE.search(cell_lower):
+                transaction['type'] = 'Credit'
+            else:
+                is_type = False
+        else:
+            is_type = _TYPE_KW_RE.search(cell_lower) is not None
         
-        if not is_date and not is_amount and not is_type and not is_header and len(cell_str) > 3:
+        # Skip dates, amounts, type indicators, times, reference numbers,
+        # very short cells and common headers
+        if (date_match is None and not is_amount and not is_type and len(cell_str) > 3
+                and not _TIME_RE.fullmatch(cell_str) and not _REF_NUM_RE.search(cell_str)
+                and not _CELL_HEADER_RE.search(cell_lower)):
             descriptions.append(cell_str)
     
     if descriptions:
@@ -281,77 +588,91 @@ def _parse_table_row(row_data, debug=False):
     return None
 
 
+def _is_plain_amount(cell_str):
+    """
+    Check for a bare number cell such as "85" or "314.43" with string methods;
+    anything else (signs, commas, currency) is left to the amount pattern
+    """
+    whole, dot, frac = cell_str.partition('.')
+    return whole.isdecimal() and (not dot or (frac.isdecimal() and len(frac) <= 2))
+
+
+def _normalize_amount(cell_str):
+    """
+    Strip currency symbols and words, Dr/Cr and "/-" markers and spaces from
+    a cell before amount matching
+    """
+    return _AMOUNT_MARKER_RE.sub('', cell_str).translate(_AMOUNT_STRIP_TBL)
+
+
 def _parse_text_transactions(text, debug=False):
     """
     Parse transactions from plain text (fallback method)
     Handles GPay format: "01Oct,2025 PaidtoShiv Kumar ₹85 08:38AM UPITransactionID:..."
     Also handles multiple transactions on the same line
+    
+    Returns:
+        Tuple of (transactions, unparsed), where unparsed counts dates outside
+        header and summary lines that didn't yield a transaction
     """
     transactions = []
+    unparsed = 0
     
-    # GPay-specific date pattern: DD MMM, YYYY (e.g., "01Oct,2025")
-    # This matches: 1-2 digits, 3 letters (month), comma, 4 digits (year)
-    date_pattern = r'(\d{1,2}[A-Za-z]{3},\d{4})'
-    
-    # Amount pattern: ₹ symbol followed by number with optional decimals and Indian comma notation
-    # Matches: ₹85, ₹314.43, ₹1,64,148.10
-    amount_pattern = r'₹\s*(\d{1,3}(?:[,]\d{2,3})*(?:[.]\d{1,2})?)'
+    date_pattern = _GPAY_TEXT_DATE_RE
+    amount_pattern = _GPAY_AMOUNT_RE
     
     # Transaction type keywords
     debit_keywords = ['paidto', 'selftransferto', 'paid']
     credit_keywords = ['receivedfrom', 'received', 'credited']
     
-    # Split text into lines first
-    lines = text.split('\n')
+    # Find every date in one scan of the page; each date match represents a potential
+    # transaction start, and a line can hold several transactions
+    date_matches = list(date_pattern.finditer(text))
+    line_end = -1
+    skip_line = False
+    short_line = False
     
-    # Process each line - but also split by date pattern in case multiple transactions are on same line
-    for line in lines:
-        if not line.strip() or len(line.strip()) < 15:
-            continue
+    for i, date_match in enumerate(date_matches):
+        start_pos = date_match.start()
         
-        # Skip header lines and summary lines
-        line_lower = line.lower()
-        skip_headers = [
-            'date&time', 'transactiondetails', 'amount', 
-            'transaction statement', 'statementperiod', 'sent received',
-            'contact', '8081100105'
-        ]
-        if any(header in line_lower for header in skip_headers):
-            continue
+        # First date on a new line: check that line once
+        if start_pos > line_end:
+            line_start = text.rfind('\n', 0, start_pos) + 1
+            line_end = text.find('\n', start_pos)
+            if line_end == -1:
+                line_end = len(text)
+            line = text[line_start:line_end]
+            # Skip header and summary lines, and short lines (a date whose other
+            # fields were laid out on other lines)
+            skip_line = _SKIP_RE.search(line.lower()) is not None
+            short_line = len(line.strip()) < 15
         
-        # Skip lines that don't look like transactions (no date pattern)
-        if not re.search(date_pattern, line, re.IGNORECASE):
+        if skip_line:
             continue
+        if short_line:
+            unparsed += 1
+            continue
+        
+        # End position is either the next date match or end of line
+        end_pos = line_end
+        if i + 1 < len(date_matches):
+            end_pos = min(date_matches[i + 1].start(), line_end)
         
-        # Split line by date pattern to handle multiple transactions on same line
-        # Find all date matches
-        date_matches = list(re.finditer(date_pattern, line, re.IGNORECASE))
+        transaction_text = text[start_pos:end_pos].strip()
         
-        if not date_matches:
+        if not transaction_text or len(transaction_text) < 10:
+            unparsed += 1
             continue
         
-        # Process each transaction (each date match represents a potential transaction start)
-        for i, date_match in enumerate(date_matches):
-            # Get the text for this transaction
-            start_pos = date_match.start()
-            # End position is either the next date match or end of line
-            if i + 1 < len(date_matches):
-                end_pos = date_matches[i + 1].start()
-            else:
-                end_pos = len(line)
-            
-            transaction_text = line[start_pos:end_pos].strip()
-            
-            if not transaction_text or len(transaction_text) < 10:
-                continue
-            
-            # Now parse this transaction
-            transaction = _parse_single_transaction(transaction_text, date_pattern, amount_pattern, 
-                                                   debit_keywords, credit_keywords, debug)
-            if transaction:
-                transactions.append(transaction)
+        # Now parse this transaction
+        transaction = _parse_single_transaction(transaction_text, date_pattern, amount_pattern, 
+                                               debit_keywords, credit_keywords, debug)
+        if transaction:
+            transactions.append(transaction)
+        else:
+            unparsed += 1
     
-    return transactions
+    return transactions, unparsed
 
 
 def _parse_single_transaction(transaction_text, date_pattern, amount_pattern, 
@@ -363,7 +684,7 @@ def _parse_single_transaction(transaction_text, date_pattern, amount_pattern,
     line_lower = transaction_text.lower()
     
     # Find date (should be at the start)
-    date_match = re.search(date_pattern, transaction_text, re.IGNORECASE)
+    date_match = date_pattern.search(transaction_text)
     if date_match:
         try:
             date_str = date_match.group(1).strip()
@@ -378,7 +699,7 @@ def _parse_single_transaction(transaction_text, date_pattern, amount_pattern,
         return None  # Skip if no date found
     
     # Find amount (₹ symbol followed by number)
-    amount_match = re.search(amount_pattern, transaction_text)
+    amount_match = amount_pattern.search(transaction_text)
     if amount_match:
         try:
             amount_str = amount_match.group(1).replace(',', '')  # Remove Indian comma notation
@@ -413,19 +734,16 @@ def _parse_single_transaction(transaction_text, date_pattern, amount_pattern,
         desc = desc.replace(amount_match.group(0), '', 1).strip()
     
     # Remove time pattern (HH:MM AM/PM) - usually comes after amount
-    desc = re.sub(r'\d{1,2}:\d{2}\s*(AM|PM)', '', desc, flags=re.IGNORECASE).strip()
+    desc = _TIME_RE.sub('', desc)
     
     # Remove UPI Transaction ID (UPITransactionID:XXXXXXXXX)
-    desc = re.sub(r'UPITransactionID:\s*\d+', '', desc, flags=re.IGNORECASE).strip()
+    desc = _UPI_RE.sub('', desc)
     
     # Remove bank info (PaidbyBankNameAccountNumber)
-    desc = re.sub(r'Paidby[A-Za-z]+\d+', '', desc, flags=re.IGNORECASE).strip()
+    desc = _BANK_RE.sub('', desc)
     
-    # Clean up multiple spaces
-    desc = re.sub(r'\s+', ' ', desc).strip()
-    
-    # Remove leading/trailing special characters
-    desc = desc.strip(' ,-')
+    # Clean up multiple spaces, then leading/trailing special characters
+    desc = _WS_RE.sub(' ', desc).strip().strip(' ,-')
     
     # If we have a valid description, use it
     if desc and len(desc) > 1:
@@ -437,7 +755,7 @@ def _parse_single_transaction(transaction_text, date_pattern, amount_pattern,
         amount_start = amount_match.start()
         if amount_start > date_end:
             desc = transaction_text[date_end:amount_start].strip()
-            desc = re.sub(r'\s+', ' ', desc).strip()
+            desc = _WS_RE.sub(' ', desc).strip()
             if desc and len(desc) > 1:
                 transaction['description'] = desc
             else:
@@ -458,48 +776,26 @@ def _parse_date(date_str):
     
     # Handle GPay format first: "01Oct,2025" (day + month abbreviation + comma + year)
     # Python's strptime doesn't handle comma directly, so we need to parse it manually
-    gpay_pattern = r'(\d{1,2})([A-Za-z]{3}),(\d{4})'
-    gpay_match = re.match(gpay_pattern, date_str, re.IGNORECASE)
+    gpay_match = _GPAY_DATE_RE.match(date_str)
     if gpay_match:
         try:
             day = int(gpay_match.group(1))
-            month_str = gpay_match.group(2).capitalize()
+            month = _MONTHS.get(gpay_match.group(2).lower())
             year = int(gpay_match.group(3))
             
-            # Map month abbreviations to numbers
-            months = {
-                'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
-                'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
-            }
-            
-            if month_str in months:
-                return datetime(year, months[month_str], day)
+            if month:
+                return datetime(year, month, day)
         except:
             pass
     
-    # Common formats (Indian formats first, including GPay format)
-    formats = [
-        '%d %b, %Y',     # 01 Oct, 2025
-        '%d%b %Y',       # 01Oct 2025
-        '%d %b %Y',      # 01 Oct 2025
-        '%d-%m-%Y',      # 25-12-2024
-        '%d/%m/%Y',      # 25/12/2024
-        '%d.%m.%Y',      # 25.12.2024
-        '%d-%m-%y',      # 25-12-24
-        '%d/%m/%y',      # 25/12/24
-        '%d.%m.%y',      # 25.12.24
-        '%Y-%m-%d',      # 2024-12-25
-        '%Y/%m/%d',      # 2024/12/25
-        '%d %B %Y',      # 25 December 2024
-        '%d-%b-%Y',      # 25-Dec-2024
-        '%d-%B-%Y',      # 25-December-2024
-        '%b %d, %Y',     # Dec 25, 2024
-        '%B %d, %Y',     # December 25, 2024
-        '%m/%d/%Y',      # 12/25/2024 (US format)
-        '%m-%d-%Y',      # 12-25-2024 (US format)
-    ]
-    
-    for fmt in formats:
+    # Common shapes are parsed directly. Anything they can't turn into a
+    # valid date (e.g. an out-of-range day) falls through to strptime below,
+    # so results match the format list
+    parsed = _parse_date_fast(date_str)
+    if parsed is not None:
+        return parsed
+    
+    for fmt in _DATE_FORMATS:
         try:
             return datetime.strptime(date_str, fmt)
         except:
@@ -508,7 +804,7 @@ def _parse_date(date_str):
     # If all formats fail, try to parse flexibly
     try:
         # Extract numbers from date string
-        numbers = re.findall(r'\d+', date_str)
+        numbers = _NUM_RE.findall(date_str)
         if len(numbers) >= 3:
             num1, num2, year = int(numbers[0]), int(numbers[1]), int(numbers[2])
             if year < 100:
@@ -527,34 +823,49 @@ def _parse_date(date_str):
     return datetime.now()
 
 
+def _parse_date_fast(date_str):
+    """
+    Parse the common numeric and "DD Mon YYYY" shapes without strptime
+    
+    Returns:
+        datetime, or None if the string isn't one of these shapes or isn't
+        a valid date
+    """
+    try:
+        match = _DMY_RE.match(date_str)
+        if match:
+            day, month, year = int(match.group(1)), int(match.group(3)), match.group(4)
+            if len(year) == 2:
+                # Same pivot as strptime's %y
+                year = int(year) + (2000 if int(year) <= 68 else 1900)
+            return datetime(int(year), month, day)
+        
+        match = _YMD_RE.match(date_str)
+        if match:
+            return datetime(int(match.group(1)), int(match.group(3)), int(match.group(4)))
+        
+        match = _D_MON_Y_RE.match(date_str)
+        if match:
+            month = _MONTHS.get(match.group(2).lower())
+            if month:
+                return datetime(int(match.group(3)), month, int(match.group(1)))
+    except ValueError:
+        pass
+    return None
+
+
 def _clean_dataframe(df):
     """
-    Clean and standardize the DataFrame
+    Clean and standardize the DataFrame; columns arrive already typed
+    (datetime64 date, float64 amount, categorical type) from parse_gpay_pdf,
+    so dedup and sort hash/compare NumPy arrays, not Python objects
     """
     if df.empty:
         return df
     
-    # Ensure required columns exist
-    required_columns = ['date', 'description', 'amount', 'type']
-    for col in required_columns:
-        if col not in df.columns:
-            if col == 'date':
-                df[col] = datetime.now()
-            elif col == 'description':
-                df[col] = 'Unknown'
-            elif col == 'amount':
-                df[col] = 0.0
-            elif col == 'type':
-                df[col] = 'Debit'
-    
-    # Remove duplicates
-    df = df.drop_duplicates()
-    
-    # Sort by date
-    df = df.sort_values('date', ascending=False)
-    
-    # Reset index
-    df = df.reset_index(drop=True)
+    # Remove duplicates, then sort by date (newest first)
+    df = df.drop_duplicates(subset=['date', 'amount', 'description'], ignore_index=True)
+    df = df.sort_values('date', ascending=False, kind='mergesort', ignore_index=True)
     
     return df
 